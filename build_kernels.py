@@ -0,0 +1,23 @@
+"""build_kernels.py - Ahead-of-time compile the t2wee conversion kernel with Numba.
+
+Running this script builds a t2wee_kernels extension module next to t2wee.py.
+t2wee.py imports it when present, so runs skip the Numba JIT warm-up, which
+otherwise dominates short incremental backfills. Requires numba; rebuild after
+changing _scale_columns_loop.
+"""
+
+import os
+
+from numba.pycc import CC
+
+import t2wee
+
+cc = CC("t2wee_kernels")
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+
+# A (fields x observations) float64 array, scaled in place by per-field vectors
+cc.export("scale_columns", "void(f8[:, :], f8[:], f8[:])")(t2wee._scale_columns_loop)
+
+
+if __name__ == "__main__":
+    cc.compile()
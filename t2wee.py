@@ -1,14 +1,43 @@
 """t2wee.py - A utility to import your WeatherFlow tempest data into weewx."""
 
 import argparse
+import collections
+import concurrent.futures
+import contextlib
 import csv
 import datetime
+import gzip
+import hashlib
 import logging
-import time
 import os
+import numpy as np
 import requests
 import sqlite3
-from typing import List, Dict, Any
+import threading
+import time
+from itertools import repeat
+from requests.adapters import HTTPAdapter
+from typing import List, Any, Tuple
+from urllib3.exceptions import ResponseError
+from urllib3.util import Retry
+
+try:
+    import numba
+    from numba import prange
+except ImportError:  # Optional - conversions fall back to plain NumPy
+    numba = None
+    prange = range
+
+try:
+    from orjson import loads as json_loads
+except ImportError:  # Optional - stdlib json is slower on large responses
+    from json import loads as json_loads
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional - only needed for --mode parquet
+    pa = pq = None
 
 # --- Configuration ---
 # Default values - can be overridden by command-line arguments or environment variables
@@ -16,22 +45,179 @@ DEFAULT_API_TOKEN = "0a36ab0b-baf7-4a0f-a108-e78119ccba96"  # Replace with a pla
 DEFAULT_DEVICE_ID = "83997"  # Tempest device ID (not station ID!)
 DEFAULT_START_DATE = "2020-01-01"  # YYYY-MM-DD
 DEFAULT_OUTPUT_FILE = "wx.csv"
+DEFAULT_PARQUET_FILE = "wx.parquet"
 DEFAULT_DB_PATH = "/data/archive/weewx.sdb"  # WeeWX database path
 DEFAULT_INTERVAL = 5  # 5-minute archive interval (standard for WeeWX)
 DEFAULT_US_UNITS = 1  # 1 = US customary units (F, mph, inHg)
+DEFAULT_CHUNK_DAYS = 4  # Days of observations requested per API call
+DEFAULT_WORKERS = 4  # Concurrent API requests
+DEFAULT_RATE_LIMIT = 60  # API requests per minute, lowered automatically on HTTP 429
+CACHE_MIN_AGE = 3600  # Don't cache windows ending less than an hour ago (still filling in)
 # --- End Configuration ---
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+# Positions of the fields used from a device observation array. The full
+# layout is: [0]=timestamp, [1]=lull, [2]=avg, [3]=gust, [4]=dir, [5]=pressure,
+# [6]=temp, [7]=humidity, [8]=illuminance, [9]=uv, [10]=solar, [11]=rain_prev_min,
+# [12]=precip_type, [13]=lightning_avg_dist, [14]=lightning_count, [15]=battery, [16]=interval
+OBS_TIMESTAMP = 0
+OBS_WIND_AVG = 2
+OBS_WIND_GUST = 3
+OBS_WIND_DIRECTION = 4
+OBS_AIR_TEMPERATURE = 6
+OBS_RELATIVE_HUMIDITY = 7
+OBS_UV = 9
+OBS_SOLAR_RADIATION = 10
+OBS_PRECIP = 11  # rain in previous minute
+OBS_FIELD_COUNT = 17
+
+# WeeWX archive columns written by this script, in the order rows are built
+WEEWX_COLUMNS = (
+    "dateTime",
+    "usUnits",
+    "interval",
+    "outTemp",
+    "windSpeed",
+    "windGust",
+    "windDir",
+    "barometer",
+    "outHumidity",
+    "rain",
+    "UV",
+    "radiation",
+    "lightning_distance",
 )
+_INSERT_SQL = (
+    f"INSERT OR IGNORE INTO archive ({', '.join(WEEWX_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in WEEWX_COLUMNS)})"
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _http_adapter(pool_size: int = 1) -> HTTPAdapter:
+    """Build the adapter used for API calls.
+
+    Rate limiting (429) and transient server errors are retried with backoff,
+    honouring any Retry-After header the API sends. pool_size should match the
+    number of threads sharing the session so their connections are kept alive.
+    """
+    return HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=pool_size,
+        max_retries=Retry(
+            total=5,
+            backoff_factor=1.0,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"],
+        ),
+    )
+
+
+class RateLimiter:
+    """Sliding one-minute window limiting API requests across all worker threads.
+
+    Requests only wait when the budget for the last minute is used up. If the
+    API still answers with HTTP 429, the limit is halved, at most once a
+    minute since a burst of 429s usually hits every worker at once. After a
+    minute without 429s it doubles again, back up to max_limit.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = self.max_limit = limit
+        self._sent = collections.deque()
+        self._lock = threading.Lock()
+        self._lowered_at = None  # time.monotonic() when the limit was last halved
+        self._changed_at = None  # ... and when it last moved either way
+
+    def wait(self):
+        """Block until a request fits within the limit, then record it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if self.limit < self.max_limit and now - self._changed_at >= 60:
+                    self.limit = min(self.limit * 2, self.max_limit)
+                    self._changed_at = now
+                    logger.info(
+                        "No rate limiting for a minute, raising to %d requests/minute", self.limit
+                    )
+                while self._sent and now - self._sent[0] >= 60:
+                    self._sent.popleft()
+                if len(self._sent) < self.limit:
+                    self._sent.append(now)
+                    return
+                delay = 60 - (now - self._sent[0])
+            time.sleep(delay)
+
+    def throttled(self):
+        """Lower the limit after the API reported we were going too fast."""
+        with self._lock:
+            now = time.monotonic()
+            if self._lowered_at is not None and now - self._lowered_at < 60:
+                return
+            if self.limit > 1:
+                self.limit = max(self.limit // 2, 1)
+                self._lowered_at = self._changed_at = now
+                logger.warning("API rate limited us, lowering to %d requests/minute", self.limit)
+
+
+# Shared HTTP session so every API call reuses the same keep-alive connection.
+_SESSION = requests.Session()
+_SESSION.mount("https://", _http_adapter())
+_RATE_LIMITER = RateLimiter(DEFAULT_RATE_LIMIT)
+
+
+def _cache_path(cache_dir, device_id, start_ts, end_ts):
+    """Path of the cached API response for one device and time window."""
+    key = hashlib.sha256(f"{device_id}:{start_ts}:{end_ts}".encode()).hexdigest()
+    return os.path.join(cache_dir, f"{key}.json.gz")
+
+
+def _read_cache(path):
+    """Return the cached response body, or None if it is missing or unreadable."""
+    try:
+        with gzip.open(path, "rb") as f:
+            return json_loads(f.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, ValueError) as e:
+        logger.warning("Ignoring unreadable cache file %s: %s", path, e)
+        return None
+
+
+def _write_cache(path, content):
+    """Store a response body, via a temp file so a crash never leaves a partial entry.
+
+    The cache is only an optimisation, so a failed write is logged and skipped.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with gzip.open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning("Could not write cache file %s: %s", path, e)
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
 
 
-def get_tempest_data(start_ts, end_ts, api_token, device_id):
+class RangeRejectedError(Exception):
+    """The API refused the requested time range (an HTTP 4xx other than auth or rate limiting)."""
+
+
+def get_tempest_data(start_ts, end_ts, api_token, device_id, cache_dir=None):
     """Fetches weather data from the Tempest API using device endpoint.
     
     Note: Use device_id (e.g., 83997) NOT station_id (e.g., 25998)
     The device endpoint supports historical data, station endpoint does not.
+
+    Returns None if the request or response parsing failed, so callers can
+    tell an error apart from a window that simply has no observations.
+    Raises RangeRejectedError if the API refused the time range itself, in
+    which case a smaller window may succeed.
+
+    If cache_dir is given, responses for windows that are safely in the past
+    are stored there and reused on later runs instead of calling the API.
     """
 
     url = f"https://swd.weatherflow.com/swd/rest/observations/device/{device_id}"
@@ -46,10 +232,25 @@ def get_tempest_data(start_ts, end_ts, api_token, device_id):
         "token": api_token,
     }
 
+    cache_path = _cache_path(cache_dir, device_id, start_ts, end_ts) if cache_dir else None
+
     try:
-        response = requests.get(url, headers=headers, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        data = _read_cache(cache_path) if cache_path else None
+        if data is None:
+            _RATE_LIMITER.wait()
+            response = _SESSION.get(url, headers=headers, params=params, timeout=10)
+
+            # 429s are retried (with backoff) by the adapter; slow down for the
+            # rest of the run if any of the attempts behind this response got one.
+            retries = getattr(response.raw, "retries", None)
+            if retries and any(attempt.status == 429 for attempt in retries.history):
+                _RATE_LIMITER.throttled()
+
+            response.raise_for_status()
+            data = json_loads(response.content)
+
+            if cache_path and end_ts <= time.time() - CACHE_MIN_AGE:
+                _write_cache(cache_path, response.content)
         
         # Device endpoint returns obs as arrays, not dicts
         obs_arrays = data.get("obs", [])
@@ -58,238 +259,441 @@ def get_tempest_data(start_ts, end_ts, api_token, device_id):
         if obs_arrays is None:
             return []
         
-        # Convert array format to dict format for compatibility
-        # Array indices: [0]=timestamp, [1]=lull, [2]=avg, [3]=gust, [4]=dir, [5]=pressure, 
-        # [6]=temp, [7]=humidity, [8]=illuminance, [9]=uv, [10]=solar, [11]=rain_prev_min,
-        # [12]=precip_type, [13]=lightning_avg_dist, [14]=lightning_count, [15]=battery, [16]=interval
-        
-        converted_obs = []
-        for obs in obs_arrays:
-            if len(obs) >= 17:  # Ensure we have all fields
-                converted_obs.append({
-                    'timestamp': obs[0],
-                    'wind_lull': obs[1],
-                    'wind_avg': obs[2],
-                    'wind_gust': obs[3],
-                    'wind_direction': obs[4],
-                    'station_pressure': obs[5],
-                    'air_temperature': obs[6],
-                    'relative_humidity': obs[7],
-                    'illuminance': obs[8],
-                    'uv': obs[9],
-                    'solar_radiation': obs[10],
-                    'precip': obs[11],  # rain in previous minute
-                    'precip_type': obs[12],
-                    'lightning_strike_avg_distance': obs[13],
-                    'lightning_strike_count': obs[14],
-                    'battery': obs[15],
-                    'report_interval': obs[16],
-                })
-        
-        return converted_obs
-
+        # Observations are passed on as plain arrays (see the OBS_* positions)
+        # and converted column-wise later; skip any that are truncated.
+        return [obs[:OBS_FIELD_COUNT] for obs in obs_arrays if len(obs) >= OBS_FIELD_COUNT]
+
+    except requests.exceptions.HTTPError as e:
+        status = e.response.status_code
+        if 400 <= status < 500 and status not in (401, 403, 429):
+            raise RangeRejectedError(str(e)) from e
+        logger.error("Error fetching Tempest data: %s", e)
+        return None
+    except requests.exceptions.RetryError as e:
+        # Retries ran out; if the API kept answering 429, slow down as well
+        reason = getattr(e.args[0], "reason", None) if e.args else None
+        if isinstance(reason, ResponseError) and "429" in str(reason):
+            _RATE_LIMITER.throttled()
+        logger.error("Error fetching Tempest data: %s", e)
+        return None
     except requests.exceptions.RequestException as e:
-        logging.error("Error fetching Tempest data: %s", e)
-        return []
+        logger.error("Error fetching Tempest data: %s", e)
+        return None
     except ValueError as e:
-        logging.error("Error parsing JSON: %s", e)
-        return []
+        logger.error("Error parsing JSON: %s", e)
+        return None
     except IndexError as e:
-        logging.error("Error parsing observation array: %s", e)
-        return []
+        logger.error("Error parsing observation array: %s", e)
+        return None
 
 
-def convert_tempest_to_weewx(obs: Dict[str, Any]) -> Dict[str, Any]:
-    """Convert a single Tempest observation to WeeWX format.
-    
-    Tempest API returns observations as dictionaries with named keys.
+class WindowSize:
+    """Width of the time windows requested from the API, shared by all worker threads.
+
+    Starts at --chunk_days and is halved (down to a day) whenever the API
+    rejects a range, so later windows are built at a width it accepts.
     """
-    return {
-        "dateTime": obs.get('timestamp'),  # Unix epoch timestamp
-        "usUnits": DEFAULT_US_UNITS,  # US customary units
-        "interval": DEFAULT_INTERVAL,  # 5-minute archive interval
-        "outTemp": (obs.get('air_temperature') * 9 / 5) + 32 if obs.get('air_temperature') is not None else None,  # C to F
-        "windSpeed": obs.get('wind_avg') * 2.23694 if obs.get('wind_avg') is not None else None,  # m/s to mph
-        "windGust": obs.get('wind_gust') * 2.23694 if obs.get('wind_gust') is not None else None,  # m/s to mph
-        "windDir": obs.get('wind_direction'),  # degrees
-        "barometer": obs.get('sea_level_pressure') * 0.02953 if obs.get('sea_level_pressure') is not None else None,  # hPa to inHg
-        "outHumidity": obs.get('relative_humidity'),  # percent
-        "rain": obs.get('precip') / 25.4 if obs.get('precip') is not None else None,  # mm to inches
-        "UV": obs.get('uv'),  # UV index
-        "radiation": obs.get('solar_radiation'),  # W/m²
-        "lightning_distance": obs.get('lightning_strike_last_distance') * 0.621371 if obs.get('lightning_strike_last_distance') is not None else None,  # km to miles
-    }
 
+    def __init__(self, seconds: int):
+        self.seconds = seconds
+        self._lock = threading.Lock()
+
+    def rejected(self, span: int):
+        """Lower the width below a span the API rejected."""
+        with self._lock:
+            if span // 2 < self.seconds:
+                self.seconds = max(span // 2, 86400)
+                logger.warning(
+                    "API rejected a %.1f day range, requesting %.1f days at a time",
+                    span / 86400, self.seconds / 86400
+                )
+
+    def windows(self, start_ts, end_ts):
+        """Yield (start, end) windows covering the range, each at the width current when built."""
+        ts = start_ts
+        while ts < end_ts:
+            window_end = min(ts + self.seconds, end_ts)
+            yield ts, window_end
+            ts = window_end
+
+
+_WINDOW_SIZE = WindowSize(DEFAULT_CHUNK_DAYS * 86400)
+
+
+def fetch_window(start_ts, end_ts, api_token, device_id, cache_dir=None):
+    """Fetch one time window, splitting it up whenever the API rejects the range.
+
+    A rejection lowers the shared window width, and the window is refetched in
+    pieces of that width, down to roughly a day. Other failures (network
+    errors, bad token, rate limiting) are not retried with smaller windows.
+    Returns None only if every part of the window failed.
+    """
+    span = end_ts - start_ts
+    if span <= _WINDOW_SIZE.seconds:
+        try:
+            return get_tempest_data(start_ts, end_ts, api_token, device_id, cache_dir)
+        except RangeRejectedError as e:
+            if span <= 86400:
+                logger.error("Error fetching Tempest data: %s", e)
+                return None
+            _WINDOW_SIZE.rejected(span)
+
+    # Wider than the API accepts (possibly built before it rejected this
+    # width), so fetch it in pieces of the current width instead
+    width = _WINDOW_SIZE.seconds
+    parts = [
+        fetch_window(ts, min(ts + width, end_ts), api_token, device_id, cache_dir)
+        for ts in range(start_ts, end_ts, width)
+    ]
+    if all(part is None for part in parts):
+        return None
+    return [obs for part in parts if part for obs in part]
+
+
+# Device fields that feed the converted WeeWX columns, in WEEWX_COLUMNS order,
+# each with the affine map to US units: value * scale + offset.
+_CONVERSIONS = (
+    (OBS_AIR_TEMPERATURE, 9 / 5, 32.0),  # outTemp: C to F
+    (OBS_WIND_AVG, 2.23694, 0.0),  # windSpeed: m/s to mph
+    (OBS_WIND_GUST, 2.23694, 0.0),  # windGust: m/s to mph
+    (OBS_WIND_DIRECTION, 1.0, 0.0),  # windDir: degrees
+    (OBS_RELATIVE_HUMIDITY, 1.0, 0.0),  # outHumidity: percent
+    (OBS_PRECIP, 1 / 25.4, 0.0),  # rain: mm to inches
+    (OBS_UV, 1.0, 0.0),  # UV: UV index
+    (OBS_SOLAR_RADIATION, 1.0, 0.0),  # radiation: W/m²
+)
+_FIELDS = np.array([field for field, _, _ in _CONVERSIONS])
+_SCALE = np.array([scale for _, scale, _ in _CONVERSIONS], dtype=np.float64)
+_OFFSET = np.array([offset for _, _, offset in _CONVERSIONS], dtype=np.float64)
+
+
+def _scale_columns_numpy(columns, scale, offset):
+    """Apply columns[j] = columns[j] * scale[j] + offset[j] in place."""
+    columns *= scale[:, np.newaxis]
+    columns += offset[:, np.newaxis]
+
+
+def _scale_columns_loop(columns, scale, offset):
+    """Same as _scale_columns_numpy as an explicit loop, for Numba to compile."""
+    for j in range(columns.shape[0]):
+        a = scale[j]
+        b = offset[j]
+        for i in prange(columns.shape[1]):
+            columns[j, i] = columns[j, i] * a + b
+
+
+# Prefer the ahead-of-time compiled kernel (see build_kernels.py), which
+# loads without any JIT warm-up; then a Numba JIT build; then plain NumPy.
+try:
+    from t2wee_kernels import scale_columns as _scale_columns
+except ImportError:
+    if numba is not None:
+        # Missing values are NaN, so leave out the nnan/ninf fast-math flags.
+        _scale_columns = numba.njit(
+            parallel=True, fastmath={"contract", "afn", "arcp", "nsz", "reassoc"}, cache=True
+        )(_scale_columns_loop)
+    else:
+        _scale_columns = _scale_columns_numpy
+
+
+def convert_batch(data: List[List[Any]]) -> List[Tuple[Any, ...]]:
+    """Convert a batch of Tempest observations to WeeWX archive rows.
+
+    Each observation is a device array indexed by the OBS_* positions, and
+    rows come back in WEEWX_COLUMNS order. The batch is loaded into a NumPy
+    array once and all unit conversions are applied in a single pass using the
+    _CONVERSIONS scale and offset vectors (compiled with Numba when it is
+    installed). Missing values travel through as NaN and come back out as None;
+    pass-through fields come back as floats. The device endpoint doesn't report
+    sea-level pressure, so barometer is left empty.
+    """
+    batch = np.array(data, dtype=np.float64).reshape(-1, OBS_FIELD_COUNT)
+
+    # One contiguous row per converted field
+    columns = np.ascontiguousarray(batch[:, _FIELDS].T)
+    _scale_columns(columns, _SCALE, _OFFSET)
+
+    date_times = batch[:, OBS_TIMESTAMP].astype(np.int64).tolist()
+    (
+        out_temp,
+        wind_speed,
+        wind_gust,
+        wind_dir,
+        out_humidity,
+        rain,
+        uv,
+        radiation,
+    ) = np.where(np.isnan(columns), None, columns).tolist()
+
+    return list(zip(
+        date_times,
+        repeat(DEFAULT_US_UNITS),
+        repeat(DEFAULT_INTERVAL),
+        out_temp,
+        wind_speed,
+        wind_gust,
+        wind_dir,
+        repeat(None),  # barometer
+        out_humidity,
+        rain,
+        uv,
+        radiation,
+        repeat(None),  # lightning_distance
+    ))
+
+
+def open_database(db_path: str) -> sqlite3.Connection:
+    """Opens the WeeWX SQLite database, tuned for bulk inserts.
+
+    The connection is meant to be kept for the whole run so SQLite's page
+    cache stays warm between batches.
+    """
+    conn = sqlite3.connect(db_path)
+    # WAL makes each commit an append to the log, and NORMAL skips the
+    # fsync of the log on every commit (still safe in WAL mode).
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")  # ~20 MB page cache
+    return conn
+
+
+def insert_into_database(data: List[List[Any]], conn: sqlite3.Connection) -> int:
+    """Insert Tempest data directly into WeeWX SQLite database.
+
+    conn is a connection returned by open_database(). The whole batch is
+    written and committed in a single transaction. Timestamps already in
+    the archive are fetched with one range query and filtered out up front;
+    INSERT OR IGNORE (archive.dateTime is the primary key) covers any
+    duplicates within the batch itself.
+    """
+    if not data:
+        return 0
 
-def insert_into_database(data: List[List[Any]], db_path: str) -> int:
-    """Insert Tempest data directly into WeeWX SQLite database."""
-    inserted_count = 0
-    skipped_count = 0
-    
     try:
-        conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
-        
-        for obs in data:
-            weewx_record = convert_tempest_to_weewx(obs)
-            date_time = weewx_record['dateTime']
-            
-            # Check if record already exists
-            cursor.execute("SELECT COUNT(*) FROM archive WHERE dateTime = ?", (date_time,))
-            exists = cursor.fetchone()[0] > 0
-            
-            if exists:
-                skipped_count += 1
-                continue
-            
-            # Insert the record
-            columns = ', '.join(weewx_record.keys())
-            placeholders = ', '.join(['?' for _ in weewx_record])
-            query = f"INSERT INTO archive ({columns}) VALUES ({placeholders})"
-            
-            cursor.execute(query, list(weewx_record.values()))
-            inserted_count += 1
-        
+
+        timestamps = [obs[OBS_TIMESTAMP] for obs in data]
+        cursor.execute(
+            "SELECT dateTime FROM archive WHERE dateTime BETWEEN ? AND ?",
+            (min(timestamps), max(timestamps)),
+        )
+        existing = {row[0] for row in cursor}
+        if existing and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Already in archive, skipping: %s",
+                ", ".join(str(ts) for ts in sorted(existing.intersection(timestamps)))
+            )
+        rows = convert_batch([obs for obs in data if obs[OBS_TIMESTAMP] not in existing])
+
+        inserted_count = 0
+        if rows:
+            cursor.execute("BEGIN")
+            cursor.executemany(_INSERT_SQL, rows)
+            inserted_count = cursor.rowcount
+        skipped_count = len(data) - inserted_count
+
         conn.commit()
-        conn.close()
         
-        logging.info(f"Database insert: {inserted_count} inserted, {skipped_count} skipped (duplicates)")
+        logger.info("Database insert: %d inserted, %d skipped (duplicates)", inserted_count, skipped_count)
         return inserted_count
         
     except sqlite3.Error as e:
-        logging.error(f"SQLite error: {e}")
+        conn.rollback()
+        logger.error("SQLite error: %s", e)
         return 0
     except Exception as e:
-        logging.exception(f"Error writing to database: {e}")
+        conn.rollback()
+        logger.exception("Error writing to database: %s", e)
         return 0
 
 
-def insert_into_csv(data, output_file):
-    """Inserts Tempest data into a CSV file, mapping to a Weewx-like schema."""
+def open_csv(output_file):
+    """Opens the CSV output for appending and returns (file, csv writer).
+
+    The header row is written only if the file is new (or empty).
+    """
+    write_header = not os.path.exists(output_file) or os.path.getsize(output_file) == 0
+    csvfile = open(output_file, "a", newline="", encoding="utf-8", buffering=1 << 20)
+    writer = csv.writer(csvfile)
+    if write_header:
+        writer.writerow(WEEWX_COLUMNS)
+    return csvfile, writer
+
+
+def insert_into_csv(data, writer):
+    """Inserts Tempest data into a CSV file, mapping to a Weewx-like schema.
+
+    writer is a csv writer returned by open_csv().
+    """
     try:
-        # Check if the file exists to determine whether to write headers
-        file_exists = os.path.exists(output_file)
-
-        with open(output_file, "a", newline="", encoding="utf-8") as csvfile:
-            writer = csv.writer(csvfile)
-
-            # Write headers only if the file is newly created
-            if not file_exists:
-                writer.writerow(
-                    [
-                        "dateTime",
-                        "usUnits",
-                        "interval",
-                        "outTemp",
-                        "windSpeed",
-                        "windGust",
-                        "windDir",
-                        "barometer",
-                        "outHumidity",
-                        "rain",
-                        "UV",
-                        "radiation",
-                        "lightning_distance",
-                    ]
-                )
+        writer.writerows(convert_batch(data))
 
-            for obs in data:
-                weewx_record = convert_tempest_to_weewx(obs)
-                # Write only the columns we defined in the header
-                writer.writerow([
-                    weewx_record['dateTime'],
-                    weewx_record['usUnits'],
-                    weewx_record['interval'],
-                    weewx_record['outTemp'],
-                    weewx_record['windSpeed'],
-                    weewx_record['windGust'],
-                    weewx_record['windDir'],
-                    weewx_record['barometer'],
-                    weewx_record['outHumidity'],
-                    weewx_record['rain'],
-                    weewx_record['UV'],
-                    weewx_record['radiation'],
-                    weewx_record['lightning_distance'],
-                ])
+    except Exception as e:
+        logger.exception("Error writing to CSV: %s", e)  # Use logging
+
+
+def _parquet_schema():
+    """Arrow schema for WEEWX_COLUMNS."""
+    return pa.schema(
+        [
+            ("dateTime", pa.int64()),
+            ("usUnits", pa.int64()),
+            ("interval", pa.int64()),
+            ("outTemp", pa.float64()),
+            ("windSpeed", pa.float64()),
+            ("windGust", pa.float64()),
+            ("windDir", pa.float64()),
+            ("barometer", pa.float64()),
+            ("outHumidity", pa.float64()),
+            ("rain", pa.float64()),
+            ("UV", pa.float64()),
+            ("radiation", pa.float64()),
+            ("lightning_distance", pa.float64()),
+        ]
+    )
+
+
+def insert_into_parquet(data, writer):
+    """Appends Tempest data to an open Parquet file as one row group.
+
+    writer is a pyarrow.parquet.ParquetWriter created with _parquet_schema().
+    """
+    try:
+        columns = zip(*convert_batch(data))
+        table = pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for field, column in zip(writer.schema, columns)],
+            schema=writer.schema,
+        )
+        writer.write_table(table)
 
     except Exception as e:
-        logging.exception("Error writing to CSV: %s", e)  # Use logging
+        logger.exception("Error writing to Parquet: %s", e)
 
 
-def main(api_token, device_id, start_date_str, output_file, db_path=None, mode='csv'):
+def main(api_token, device_id, start_date_str, output_file, db_path=None, mode='csv',
+         chunk_days=DEFAULT_CHUNK_DAYS, workers=DEFAULT_WORKERS, cache_dir=None,
+         rate_limit=DEFAULT_RATE_LIMIT):
     """Main function to orchestrate data retrieval and insertion.
     
     Args:
         api_token: WeatherFlow API token
         device_id: WeatherFlow device ID (e.g., 83997 for Tempest sensor)
         start_date_str: Start date in YYYY-MM-DD format
-        output_file: Output CSV file (for csv mode)
+        output_file: Output file (for csv and parquet modes)
         db_path: Path to WeeWX SQLite database (for db mode)
-        mode: 'csv' or 'db' - determines output method
+        mode: 'csv', 'parquet' or 'db' - determines output method
+        chunk_days: Number of days requested per API call
+        workers: Number of API requests run concurrently
+        cache_dir: Directory for cached API responses (None disables caching)
+        rate_limit: Maximum API requests per minute
     """
 
     try:
         start_date = datetime.datetime.strptime(start_date_str, "%Y-%m-%d")
     except ValueError:
-        logging.error("Invalid start date format.  Use YYYY-MM-DD.")
+        logger.error("Invalid start date format.  Use YYYY-MM-DD.")
         return
 
     end_date = datetime.datetime.now()
     start_ts = int(start_date.timestamp())
     end_ts = int(end_date.timestamp())
 
-    current_ts = start_ts
-    interval = 86400  # 1 day chunks
     total_inserted = 0
     total_skipped = 0
 
-    logging.info(f"Starting backfill in '{mode}' mode from {start_date_str} to now")
+    logger.info("Starting backfill in '%s' mode from %s to now", mode, start_date_str)
     if mode == 'db':
-        logging.info(f"Target database: {db_path}")
+        logger.info("Target database: %s", db_path)
+    elif mode == 'parquet':
+        logger.info("Target Parquet file: %s", output_file)
     else:
-        logging.info(f"Target CSV file: {output_file}")
-
-    while current_ts < end_ts:
-        try:
-            next_ts = min(current_ts + interval, end_ts)
-            tempest_data = get_tempest_data(current_ts, next_ts, api_token, device_id)
-            
-            if tempest_data:
-                if mode == 'db':
-                    inserted = insert_into_database(tempest_data, db_path)
-                    total_inserted += inserted
-                    total_skipped += (len(tempest_data) - inserted)
-                else:
-                    insert_into_csv(tempest_data, output_file)
-                    total_inserted += len(tempest_data)
-                
-                logging.info(
-                    "Processed %d records for %s", 
-                    len(tempest_data),
-                    datetime.datetime.fromtimestamp(current_ts)
+        logger.info("Target CSV file: %s", output_file)
+
+    _SESSION.mount("https://", _http_adapter(workers))
+    _RATE_LIMITER.limit = _RATE_LIMITER.max_limit = rate_limit
+    _WINDOW_SIZE.seconds = chunk_days * 86400
+
+    # Outputs stay open for the whole run rather than being reopened per
+    # window (Parquet files can't be appended to at all).
+    with contextlib.ExitStack() as outputs:
+        if mode == 'parquet':
+            parquet_writer = outputs.enter_context(
+                pq.ParquetWriter(
+                    output_file, _parquet_schema(), compression='zstd', use_dictionary=True
                 )
-            else:
-                logging.warning(
-                    "No data retrieved for timestamp range: %s to %s", 
-                    datetime.datetime.fromtimestamp(current_ts),
-                    datetime.datetime.fromtimestamp(next_ts)
-                )
-            current_ts = next_ts
-            time.sleep(5)  # Be nice to the API (5s delay to avoid 429 rate limits)
-
-        except Exception as e:
-            logging.exception("Error during processing: %s", e)
-            logging.error(
-                "Error retrieving/writing results for %s", datetime.datetime.fromtimestamp(current_ts)
             )
-    
+        elif mode == 'db':
+            db_conn = outputs.enter_context(contextlib.closing(open_database(db_path)))
+        else:
+            csvfile, csv_writer = open_csv(output_file)
+            outputs.enter_context(csvfile)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            # Only keep a couple of windows per worker in flight, so an
+            # interrupted run doesn't have to drain the whole backlog first.
+            # Windows are built as they are submitted, so once the API has
+            # rejected a width no later window asks for it again.
+            pending_windows = _WINDOW_SIZE.windows(start_ts, end_ts)
+            in_flight = collections.deque()
+
+            def submit_next():
+                for window_start, window_end in pending_windows:
+                    future = executor.submit(
+                        fetch_window, window_start, window_end, api_token, device_id, cache_dir
+                    )
+                    in_flight.append(((window_start, window_end), future))
+                    return
+
+            for _ in range(workers * 2):
+                submit_next()
+
+            # Fetches overlap on the worker threads, but results are written here,
+            # in order, so the database only ever sees one writer.
+            while in_flight:
+                (window_start, window_end), future = in_flight.popleft()
+                submit_next()
+                try:
+                    tempest_data = future.result()
+
+                    if tempest_data:
+                        if mode == 'db':
+                            inserted = insert_into_database(tempest_data, db_conn)
+                            total_inserted += inserted
+                            total_skipped += (len(tempest_data) - inserted)
+                        elif mode == 'parquet':
+                            insert_into_parquet(tempest_data, parquet_writer)
+                            total_inserted += len(tempest_data)
+                        else:
+                            insert_into_csv(tempest_data, csv_writer)
+                            total_inserted += len(tempest_data)
+
+                        logger.info(
+                            "Processed %d records for %s",
+                            len(tempest_data),
+                            datetime.datetime.fromtimestamp(window_start)
+                        )
+                    else:
+                        logger.warning(
+                            "No data retrieved for timestamp range: %s to %s",
+                            datetime.datetime.fromtimestamp(window_start),
+                            datetime.datetime.fromtimestamp(window_end)
+                        )
+
+                except Exception as e:
+                    logger.exception("Error during processing: %s", e)
+                    logger.error(
+                        "Error retrieving/writing results for %s",
+                        datetime.datetime.fromtimestamp(window_start)
+                    )
+
     # Summary
-    logging.info("="*60)
-    logging.info("BACKFILL COMPLETE")
-    logging.info(f"Total records inserted: {total_inserted}")
+    logger.info("="*60)
+    logger.info("BACKFILL COMPLETE")
+    logger.info("Total records inserted: %d", total_inserted)
     if mode == 'db':
-        logging.info(f"Total records skipped (duplicates): {total_skipped}")
-    logging.info("="*60)
+        logger.info("Total records skipped (duplicates): %d", total_skipped)
+    logger.info("="*60)
 
 
 if __name__ == "__main__":
@@ -313,8 +717,7 @@ if __name__ == "__main__":
     )
     parser.add_argument(
         "--output_file",
-        default=DEFAULT_OUTPUT_FILE,
-        help="Output CSV file (for csv mode, defaults to wx.csv)",
+        help="Output file (for csv/parquet mode, defaults to wx.csv or wx.parquet)",
     )
     parser.add_argument(
         "--db_path",
@@ -323,24 +726,85 @@ if __name__ == "__main__":
     )
     parser.add_argument(
         "--mode",
-        choices=['csv', 'db'],
+        choices=['csv', 'parquet', 'db'],
         default='db',
-        help="Output mode: 'csv' for CSV file, 'db' for direct SQLite insert (default: db)",
+        help="Output mode: 'csv' for CSV file, 'parquet' for Parquet file, "
+             "'db' for direct SQLite insert (default: db)",
+    )
+
+    parser.add_argument(
+        "--chunk_days",
+        type=int,
+        default=DEFAULT_CHUNK_DAYS,
+        help=f"Days of data requested per API call (defaults to {DEFAULT_CHUNK_DAYS})",
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Number of concurrent API requests (defaults to {DEFAULT_WORKERS})",
+    )
+
+    parser.add_argument(
+        "--cache_dir",
+        default=os.environ.get("TEMPEST_CACHE_DIR"),
+        help="Directory to cache API responses in, so re-runs skip windows already "
+             "downloaded (defaults to env var TEMPEST_CACHE_DIR, disabled if unset)",
+    )
+
+    parser.add_argument(
+        "--rate_limit",
+        type=int,
+        default=DEFAULT_RATE_LIMIT,
+        help=f"Maximum API requests per minute, lowered automatically if the API "
+             f"returns HTTP 429 (defaults to {DEFAULT_RATE_LIMIT})",
+    )
+
+    log_levels = ["DEBUG", "INFO", "WARNING", "ERROR"]
+    parser.add_argument(
+        "--log_level",
+        type=str.upper,
+        choices=log_levels,
+        default=os.environ.get("T2WEE_LOG_LEVEL", "INFO"),
+        help="Logging verbosity (defaults to env var T2WEE_LOG_LEVEL, or INFO)",
     )
 
     args = parser.parse_args()
 
+    # argparse doesn't check a default against choices, so the env var needs it here
+    if args.log_level not in log_levels:
+        parser.error(
+            f"invalid T2WEE_LOG_LEVEL: {args.log_level!r} (choose from {', '.join(log_levels)})"
+        )
+
+    logging.basicConfig(
+        level=args.log_level, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
     # Check for required arguments being placeholders
     if args.api_token == "YOUR_API_TOKEN" or args.device_id == "YOUR_DEVICE_ID":
-        logging.error(
+        logger.error(
             "API token and Device ID must be set via command line arguments or environment variables."
         )
         exit(1)  # Exit with an error code
 
     # Validate database path for db mode
     if args.mode == 'db' and not os.path.exists(args.db_path):
-        logging.error(f"Database file not found: {args.db_path}")
-        logging.error("Either create the database or use --mode csv")
+        logger.error("Database file not found: %s", args.db_path)
+        logger.error("Either create the database or use --mode csv")
+        exit(1)
+
+    if args.mode == 'parquet' and pa is None:
+        logger.error("--mode parquet requires pyarrow (pip install pyarrow)")
+        exit(1)
+
+    if args.output_file is None:
+        args.output_file = DEFAULT_PARQUET_FILE if args.mode == 'parquet' else DEFAULT_OUTPUT_FILE
+
+    if args.chunk_days < 1 or args.workers < 1 or args.rate_limit < 1:
+        logger.error("--chunk_days, --workers and --rate_limit must be at least 1")
         exit(1)
 
-    main(args.api_token, args.device_id, args.start_date, args.output_file, args.db_path, args.mode)
+    main(args.api_token, args.device_id, args.start_date, args.output_file, args.db_path, args.mode,
+         args.chunk_days, args.workers, args.cache_dir, args.rate_limit)